@@ -0,0 +1,102 @@
+"""Startup time and memory of actor processes that only add experiences.
+
+Each actor is a fresh spawned interpreter that imports the package, creates
+a ReplayBuffer on its own file, adds a few experiences and waits for them
+to be written.
+
+    python -m benchmarks.actor_startup --actors 16 [--lazy-schema]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def _actor(h5_path, image_shape, num_adds, lazy_schema, conn):
+    start = time.perf_counter()
+    from replaybuffer.replay_buffer import ReplayBuffer
+
+    imported = time.perf_counter()
+    replay_buffer = ReplayBuffer(
+        100_000, h5_path, None if lazy_schema else image_shape, "cpu", 32
+    )
+    created = time.perf_counter()
+
+    state = np.random.rand(*image_shape).astype(np.float32)
+    for _ in range(num_adds):
+        replay_buffer.add(state, 1, 1.0, state, False)
+
+    # Flush the saver so "add" and RSS include the HDF5 writes
+    replay_buffer.background_saver.stop()
+    replay_buffer.prefetcher.stop()
+    added = time.perf_counter()
+
+    conn.send(
+        {
+            "import": imported - start,
+            "create": created - imported,
+            "add": added - created,
+            "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "torch": "torch" in sys.modules,
+        }
+    )
+    conn.close()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--actors", type=int, default=8)
+    parser.add_argument("--adds", type=int, default=100)
+    parser.add_argument("--image-shape", type=int, nargs="+", default=[84, 84, 3])
+    parser.add_argument(
+        "--lazy-schema",
+        action="store_true",
+        help="infer the HDF5 schema from the first add instead of image_shape",
+    )
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        start = time.perf_counter()
+        processes, connections = [], []
+        for i in range(args.actors):
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            h5_path = os.path.join(temp_dir, f"actor_{i}.h5")
+            process = ctx.Process(
+                target=_actor,
+                args=(
+                    h5_path,
+                    tuple(args.image_shape),
+                    args.adds,
+                    args.lazy_schema,
+                    child_conn,
+                ),
+            )
+            process.start()
+            processes.append(process)
+            connections.append(parent_conn)
+
+        results = [conn.recv() for conn in connections]
+        for process in processes:
+            process.join()
+        wall = time.perf_counter() - start
+
+    print(f"Spawned {args.actors} actors in {wall:.2f}s")
+    for key in ("import", "create", "add", "rss_mb"):
+        values = [result[key] for result in results]
+        print(
+            f"{key:>7}: mean {statistics.mean(values):8.3f}  max {max(values):8.3f}"
+        )
+    print(f"  torch: imported in {sum(r['torch'] for r in results)}/{args.actors} actors")
+
+
+if __name__ == "__main__":
+    main()
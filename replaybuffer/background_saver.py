@@ -63,8 +63,9 @@ class BackgroundSaver:
                 continue  # Timeout reached, continue processing
 
             except Exception as e:
+                # Drop the batch but keep the thread alive, add() would block otherwise
                 self.logger.error(f"Error while saving experience: {e}")
-                break
+                buffer.clear()
 
         # If there are any remaining experiences, flush them to disk before stopping.
         if buffer:
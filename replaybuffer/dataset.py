@@ -0,0 +1,73 @@
+import math
+
+from filelock import FileLock
+from torch.utils.data import IterableDataset, get_worker_info
+
+from .disk_manager import DiskManager
+
+
+class ReplayBufferDataset(IterableDataset):
+    """Iterate once over the stored experiences in write order.
+
+    The stored range is frozen when the dataset is created. Experiences
+    added afterwards are not yielded; once the buffer is full they overwrite
+    the frozen range from its oldest end, and iteration raises
+    ``RuntimeError`` if it reaches a chunk that was overwritten. With several
+    DataLoader workers the range is split into contiguous, non-overlapping
+    shards, one per worker.
+
+    Only the file path, the snapshot and the settings are kept, so the
+    dataset pickles for any start method. Every iteration reads through its
+    own DiskManager, which shares the writer's file lock. If
+    ``yield_chunks`` is set, whole chunks are yielded instead of single
+    experiences; use it with ``DataLoader(batch_size=None)``.
+    """
+
+    def __init__(
+        self,
+        disk_manager: DiskManager,
+        chunk_size=1024,
+        read_ahead=2,
+        yield_chunks=False,
+        keys=None,
+    ):
+        self.h5_path = disk_manager.h5_path
+        self.lock_path = disk_manager.lock_path
+        self.max_size = disk_manager.max_size
+        self.snapshot = disk_manager.snapshot()
+
+        self.chunk_size = chunk_size
+        self.read_ahead = read_ahead
+        self.yield_chunks = yield_chunks
+        self.keys = keys
+
+    def __iter__(self):
+        reader = DiskManager(
+            self.h5_path, self.max_size, FileLock(self.lock_path), num_workers=1
+        )
+        start, stop = self._worker_range()
+
+        for chunk in reader.iter_chunks(
+            self.chunk_size,
+            self.read_ahead,
+            start=start,
+            stop=stop,
+            snapshot=self.snapshot,
+            keys=self.keys,
+        ):
+            if self.yield_chunks:
+                yield chunk
+                continue
+
+            for i in range(len(next(iter(chunk.values())))):
+                yield {key: value[i] for key, value in chunk.items()}
+
+    def _worker_range(self):
+        _, length, _ = self.snapshot
+        worker_info = get_worker_info()
+        if worker_info is None:
+            return 0, length
+
+        per_worker = math.ceil(length / worker_info.num_workers)
+        start = worker_info.id * per_worker
+        return min(start, length), min(start + per_worker, length)
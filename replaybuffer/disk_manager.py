@@ -1,77 +1,131 @@
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 import logging
 import numpy as np
 import h5py as h5
+from filelock import FileLock
 
 
 class DiskManager:
     disk_pointer = 0
     length = 0
+    total_writes = 0
 
-    def __init__(self, h5_path, max_size, lock, num_workers=4):
+    def __init__(self, h5_path, max_size, lock, num_workers=4, grow_size=1024):
         self.logger = logging.getLogger("DiskManager")
 
         self.h5_path = h5_path
         self.max_size = max_size
         self.lock = lock
+        self.grow_size = grow_size
+
+        # Serializes writes with readers in other processes, see ReplayBufferDataset.
+        # HDF5's own file locking is disabled: a forked process would keep
+        # holding a lock it inherited from an open file.
+        self.lock_path = f"{h5_path}.lock"
+        self.file_lock = FileLock(self.lock_path)
+        self.initialized = False
 
         self.executor = ThreadPoolExecutor(max_workers=num_workers)
 
+        # Episode boundaries kept in memory for hindsight relabeling
+        self.dones = np.zeros(max_size, dtype=bool)
+
     def _init_h5_file(self, shapes: dict):
         self.logger.debug("Initializing HDF5 file")
 
-        if not os.path.exists(self.h5_path):
-            self.logger.debug("Creating directory for HDF5 file")
-            os.makedirs(os.path.dirname(self.h5_path), exist_ok=True)
-
-        if os.path.exists(self.h5_path) and not h5.is_hdf5(self.h5_path):
-            self.logger.critical("File exists but is not a valid HDF5 file")
-            raise ValueError("File exists but is not a valid HDF5 file")
+        self._check_h5_path()
 
-        with h5.File(self.h5_path, "w") as h5_file:
+        # Datasets start empty and grow as data arrives, see _reserve
+        with h5.File(self.h5_path, "w", locking=False) as h5_file:
             for key, shape in shapes.items():
                 h5_file.create_dataset(
                     key,
-                    shape=(self.max_size, *shape),
+                    shape=(0, *shape),
                     maxshape=(self.max_size, *shape),
                     chunks=True,
                     compression="gzip",
                     dtype=np.float32,
                 )
 
+        self.initialized = True
         self.logger.debug("HDF5 file initialized")
 
+    def _check_h5_path(self):
+        if not os.path.exists(self.h5_path):
+            self.logger.debug("Creating directory for HDF5 file")
+            os.makedirs(os.path.dirname(self.h5_path), exist_ok=True)
+
+        if os.path.exists(self.h5_path) and not h5.is_hdf5(self.h5_path):
+            self.logger.critical("File exists but is not a valid HDF5 file")
+            raise ValueError("File exists but is not a valid HDF5 file")
+
+    def _reserve(self, h5_file, end):
+        size = min(self.max_size, -(-end // self.grow_size) * self.grow_size)
+        for key in h5_file.keys():
+            if h5_file[key].shape[0] < size:
+                self.logger.debug(f"Growing dataset {key} to {size} rows")
+                h5_file[key].resize(size, axis=0)
+
     def save_to_disk(self, data: dict):
         if len(data) == 0:
             return
 
-        if isinstance(data, list):
-            data = {key: np.array([exp[key] for exp in data]) for key in data[0].keys()}
-
-        with self.lock:
+        with self.lock, self.file_lock:
+            inferred = False
             try:
-                with h5.File(self.h5_path, "a") as h5_file:
+                if isinstance(data, list):
+                    data = {
+                        key: np.array([exp[key] for exp in data]) for key in data[0].keys()
+                    }
+
+                if not self.initialized:
+                    self.logger.debug("Inferring HDF5 schema from the first batch")
+                    self._init_h5_file(
+                        {key: np.shape(value)[1:] for key, value in data.items()}
+                    )
+                    inferred = True
+
+                with h5.File(self.h5_path, "a", locking=False) as h5_file:
+                    self._reserve(
+                        h5_file, self.disk_pointer + len(next(iter(data.values())))
+                    )
                     for key, value in data.items():
                         h5_file[key][
                             self.disk_pointer : self.disk_pointer + len(value)
                         ] = value
+                    h5_file.attrs["total_writes"] = self.total_writes + len(value)
+
+                if "done" in data:
+                    done = np.asarray(data["done"]).reshape(len(value), -1)
+                    self.dones[
+                        self.disk_pointer : self.disk_pointer + len(value)
+                    ] = (done[:, 0] != 0)
 
             except Exception as e:
                 self.logger.error(f"Error saving data to disk: {e}")
                 self.logger.error(f"Data: {data}")
 
-        self.disk_pointer = (self.disk_pointer + len(value)) % self.max_size
+                # Nothing was stored, let the next batch define the schema
+                if inferred:
+                    self.initialized = False
+                return
 
-        self.length += min(self.length + len(value), self.max_size)
+            self.disk_pointer = (self.disk_pointer + len(value)) % self.max_size
 
-    def load_batch_from_disk(self, indices):
+            self.length = min(self.length + len(value), self.max_size)
+            self.total_writes += len(value)
+
+    def load_batch_from_disk(self, indices, keys=None):
         with self.lock:
-            with h5.File(self.h5_path, "r", swmr=True) as h5_file:
+            with h5.File(self.h5_path, "r", swmr=True, locking=False) as h5_file:
                 self.logger.debug(f"Loading batch from indices")
+                if keys is None:
+                    keys = h5_file.keys()
                 future_to_key = {
                     self.executor.submit(self._load_data, h5_file, key, indices): key
-                    for key in h5_file.keys()
+                    for key in keys
                 }
 
                 # Збирання результатів виконання паралельних завдань
@@ -88,6 +142,98 @@ class DiskManager:
     def _load_data(self, h5_file, key, indices):
         return h5_file[key][indices]
 
+    def episode_end_offsets(self, indices):
+        """Return the number of steps from each index to the end of its episode.
+
+        An episode that is still running ends at the newest stored experience.
+        """
+        with self.lock:
+            oldest = self._oldest()
+            positions = (np.asarray(indices) - oldest) % self.max_size
+            ends = np.sort(
+                (np.flatnonzero(self.dones[: self.length]) - oldest) % self.max_size
+            )
+            ends = np.append(ends, self.length - 1)
+        return ends[np.searchsorted(ends, positions)] - positions
+
+    def _oldest(self):
+        return self.disk_pointer if self.length == self.max_size else 0
+
+    def snapshot(self):
+        """Return ``(oldest, length, total_writes)`` for the stored range."""
+        with self.lock:
+            return self._oldest(), self.length, self.total_writes
+
+    def iter_chunks(
+        self, chunk_size, read_ahead=2, start=0, stop=None, snapshot=None, keys=None
+    ):
+        """Stream the stored experiences in write order, chunk by chunk.
+
+        ``start`` and ``stop`` are positions in write order, where 0 is the
+        oldest stored experience. Pass a ``snapshot()`` taken earlier to walk
+        a fixed range while new data keeps arriving; once the ring is full,
+        new writes overwrite that range from its oldest end, and a chunk
+        overwritten before it is read raises ``RuntimeError``. At most
+        ``read_ahead`` chunks are loaded ahead of the one being consumed.
+        """
+        snapshot = self.snapshot() if snapshot is None else snapshot
+        oldest, length, total_writes = snapshot
+        stop = length if stop is None else min(stop, length)
+
+        chunks = (
+            (
+                self._physical_slices(
+                    oldest, chunk_start, min(chunk_start + chunk_size, stop)
+                ),
+                # Writes after the snapshot reach this chunk past this count
+                total_writes + chunk_start + self.max_size - length,
+            )
+            for chunk_start in range(start, stop, chunk_size)
+        )
+
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            pending = deque(
+                reader.submit(self._load_chunk, slices, max_writes, keys)
+                for _, (slices, max_writes) in zip(range(read_ahead + 1), chunks)
+            )
+            try:
+                while pending:
+                    chunk = pending.popleft().result()
+                    yield chunk
+
+                    next_chunk = next(chunks, None)
+                    if next_chunk is not None:
+                        slices, max_writes = next_chunk
+                        pending.append(
+                            reader.submit(self._load_chunk, slices, max_writes, keys)
+                        )
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _physical_slices(self, oldest, start, stop):
+        # A chunk that crosses the end of the ring is read as two slices
+        begin = (oldest + start) % self.max_size
+        end = begin + (stop - start)
+        if end <= self.max_size:
+            return [slice(begin, end)]
+        return [slice(begin, self.max_size), slice(0, end - self.max_size)]
+
+    def _load_chunk(self, slices, max_writes, keys=None):
+        # Reading through our own file object keeps HDF5 from reusing a file
+        # it inherited as open when this process was forked
+        with self.lock:
+            with open(self.h5_path, "rb") as f, h5.File(f, "r") as h5_file:
+                if h5_file.attrs.get("total_writes", 0) > max_writes:
+                    raise RuntimeError("Chunk was overwritten before it was read")
+
+                self.logger.debug(f"Loading chunk from slices {slices}")
+                if keys is None:
+                    keys = h5_file.keys()
+                return {
+                    key: np.concatenate([h5_file[key][s] for s in slices])
+                    for key in keys
+                }
 
 if __name__ == "__main__":
     DiskManager("", 100, None)
@@ -0,0 +1,67 @@
+import logging
+import numpy as np
+
+from .disk_manager import DiskManager
+
+
+class HindsightRelabeler:
+    """Relabel sampled batches with hindsight goals (HER).
+
+    The stored ``achieved_goal`` of step t must be the goal achieved after
+    the transition, in ``next_state``. Rewards are recomputed as
+    ``reward_fn(achieved_goal, goal)``, which must be vectorized over the
+    batch dimension. With the "future" strategy the new goal is the goal
+    achieved at a random step of the same episode, from t itself to its
+    end; with "final" it is the goal achieved at the end of the episode.
+    """
+
+    strategies = ("future", "final")
+
+    def __init__(
+        self,
+        reward_fn,
+        strategy="future",
+        relabel_prob=0.8,
+        goal_key="goal",
+        achieved_goal_key="achieved_goal",
+        seed=None,
+    ):
+        if strategy not in self.strategies:
+            raise ValueError(f"Unknown relabeling strategy: {strategy}")
+
+        self.logger = logging.getLogger("HindsightRelabeler")
+        self.reward_fn = reward_fn
+        self.strategy = strategy
+        self.relabel_prob = relabel_prob
+        self.goal_key = goal_key
+        self.achieved_goal_key = achieved_goal_key
+        self.rng = np.random.default_rng(seed)
+
+    def relabel(self, disk_manager: DiskManager, indices, batch):
+        indices = np.asarray(indices)
+        relabel = self.rng.random(len(indices)) < self.relabel_prob
+        if not relabel.any():
+            return batch
+
+        offsets = disk_manager.episode_end_offsets(indices[relabel])
+        if self.strategy == "future":
+            offsets = (self.rng.random(len(offsets)) * (offsets + 1)).astype(np.int64)
+
+        future_indices = (indices[relabel] + offsets) % disk_manager.max_size
+
+        # HDF5 fancy indexing needs increasing, unique indices
+        unique_indices, inverse = np.unique(future_indices, return_inverse=True)
+        loaded = disk_manager.load_batch_from_disk(
+            unique_indices, keys=[self.achieved_goal_key]
+        )
+        goals = loaded[self.achieved_goal_key][inverse]
+
+        self.logger.debug(f"Relabeling {len(goals)} of {len(indices)} experiences")
+        batch[self.goal_key][relabel] = goals
+        rewards = np.asarray(
+            self.reward_fn(batch[self.achieved_goal_key][relabel], goals),
+            dtype=batch["reward"].dtype,
+        )
+        batch["reward"][relabel] = rewards.reshape(len(goals), -1)
+
+        return batch
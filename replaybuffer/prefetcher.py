@@ -4,12 +4,16 @@ import queue
 import numpy as np
 
 from .disk_manager import DiskManager
+from .hindsight import HindsightRelabeler
 
 
 class Prefetcher:
-    def __init__(self, disk_manager, device, batch_size, prefetch_queue_size=50):
+    def __init__(
+        self, disk_manager, device, batch_size, prefetch_queue_size=50, relabeler=None
+    ):
         self.logger = logging.getLogger("Prefetcher")
         self.disk_manager: DiskManager = disk_manager
+        self.relabeler: HindsightRelabeler = relabeler
 
         self.device = device
         self.batch_size = batch_size
@@ -58,7 +62,21 @@ class Prefetcher:
             if not self.prefetch_batches.full() and not self.sampled_indices.empty():
                 self.logger.debug("Prefetching batch")
                 indices = self.sampled_indices.get()  # Get pre-sampled indices
-                loaded_batch = self.disk_manager.load_batch_from_disk(indices)
+
+                if self.relabeler is None:
+                    loaded_batch = self.disk_manager.load_batch_from_disk(indices)
+                else:
+                    # Hold the (reentrant) lock across all reads so the saver
+                    # cannot overwrite the sampled episodes in between
+                    with self.disk_manager.lock:
+                        loaded_batch = self.disk_manager.load_batch_from_disk(indices)
+                        try:
+                            loaded_batch = self.relabeler.relabel(
+                                self.disk_manager, indices, loaded_batch
+                            )
+                        except Exception as e:
+                            self.logger.error(f"Error relabeling batch, skipping it: {e}")
+                            continue
 
                 # Optional: Move batch to device asynchronously (e.g., GPU)
                 # loaded_batch = {k: v.to(self.device) for k, v in loaded_batch.items()}
@@ -1,8 +1,7 @@
 import logging
+import sys
 import threading
 
-import torch
-
 from .disk_manager import DiskManager
 from .prefetcher import Prefetcher
 from .background_saver import BackgroundSaver
@@ -10,12 +9,25 @@ from .background_saver import BackgroundSaver
 
 class ReplayBuffer:
     def __init__(
-        self, max_size, h5_path, image_shape, device, batch_size, save_queue_size=None
+        self,
+        max_size,
+        h5_path,
+        image_shape,
+        device,
+        batch_size,
+        save_queue_size=None,
+        goal_shape=None,
+        relabeler=None,
     ):
         self.logger = logging.getLogger("ReplayBuffer")
+
+        if relabeler is not None and goal_shape is None:
+            raise ValueError("Hindsight relabeling requires goal_shape")
+
         self.max_size = max_size
         self.h5_path = h5_path
         self.image_shape = image_shape
+        self.goal_shape = goal_shape
         self.batch_size = batch_size
         self.lock = threading.RLock()
 
@@ -23,12 +35,19 @@ class ReplayBuffer:
             save_queue_size = batch_size * 2
 
         self.disk_manager = DiskManager(h5_path, max_size, self.lock)
-        self.prefetcher = Prefetcher(self.disk_manager, device, batch_size)
+        self.prefetcher = Prefetcher(
+            self.disk_manager, device, batch_size, relabeler=relabeler
+        )
         self.background_saver = BackgroundSaver(
             self.disk_manager, batch_size, queue_size=save_queue_size
         )
 
-        self._init_h5_file()
+        # Without an image shape the schema is inferred from the first add,
+        # but a bad path should still fail here rather than in the saver thread
+        if image_shape is not None:
+            self._init_h5_file()
+        else:
+            self.disk_manager._check_h5_path()
         self.start_subprocesses()
 
     def _init_h5_file(self):
@@ -39,28 +58,44 @@ class ReplayBuffer:
             "next_state": self.image_shape,
             "done": (1,),
         }
+        if self.goal_shape is not None:
+            shapes["goal"] = self.goal_shape
+            shapes["achieved_goal"] = self.goal_shape
         self.disk_manager._init_h5_file(shapes)
 
     def start_subprocesses(self):
         self.prefetcher.run()
         self.background_saver.run()
 
-    def add(self, state, action, reward, next_state, done):
+    def add(
+        self, state, action, reward, next_state, done, goal=None, achieved_goal=None
+    ):
+        """Queue one transition for saving.
+
+        With ``goal_shape`` set, ``goal`` and ``achieved_goal`` are required;
+        ``achieved_goal`` is the goal achieved in ``next_state``.
+        """
+        if self.goal_shape is not None and (goal is None or achieved_goal is None):
+            raise ValueError("goal and achieved_goal are required when goal_shape is set")
+
         state = self.prepare(state)
         action = self.prepare(action)
         reward = self.prepare(reward)
         next_state = self.prepare(next_state)
         done = self.prepare(done)
 
-        self.background_saver.save(
-            {
-                "state": state,
-                "action": [action],
-                "reward": [reward],
-                "next_state": next_state,
-                "done": [done],
-            }
-        )
+        experience = {
+            "state": state,
+            "action": [action],
+            "reward": [reward],
+            "next_state": next_state,
+            "done": [done],
+        }
+        if self.goal_shape is not None:
+            experience["goal"] = self.prepare(goal)
+            experience["achieved_goal"] = self.prepare(achieved_goal)
+
+        self.background_saver.save(experience)
 
     def sample(self):
         return self.prefetcher.get_sample()
@@ -73,7 +108,9 @@ class ReplayBuffer:
 
     @staticmethod
     def prepare(data):
-        if isinstance(data, torch.Tensor):
+        # torch is only looked up once the caller has imported it
+        torch = sys.modules.get("torch")
+        if torch is not None and isinstance(data, torch.Tensor):
             return data.cpu().numpy()
 
         return data
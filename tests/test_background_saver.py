@@ -1,8 +1,12 @@
+import os
+import tempfile
+import threading
 import unittest
 from unittest.mock import MagicMock
 from replaybuffer.background_saver import BackgroundSaver
 from replaybuffer.disk_manager import DiskManager
 import time
+import h5py as h5
 
 class TestBackgroundSaver(unittest.TestCase):
     def setUp(self):
@@ -37,5 +41,44 @@ class TestBackgroundSaver(unittest.TestCase):
         self.disk_manager.save_to_disk.assert_has_calls(calls, any_order=True)
         self.background_saver.stop()
 
+    def test_malformed_first_add(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            disk_manager = DiskManager(os.path.join(temp_dir, "test.h5"), 100, threading.RLock())
+            background_saver = BackgroundSaver(disk_manager, batch_size=1)
+            background_saver.run()
+
+            background_saver.save({"state": {"not": "an array"}, "done": [0.0]})
+            background_saver.save({"state": [1.0, 2.0], "done": [0.0]})
+
+            deadline = time.time() + 10
+            while disk_manager.length < 1 and time.time() < deadline:
+                time.sleep(0.01)
+
+            self.assertTrue(background_saver.thread.is_alive())
+            background_saver.stop()
+
+            self.assertEqual(disk_manager.length, 1)
+            with h5.File(disk_manager.h5_path, "r") as h5_file:
+                self.assertEqual(list(h5_file["state"][0]), [1.0, 2.0])
+
+    def test_save_error_keeps_thread_alive(self):
+        saved = threading.Event()
+
+        def save_to_disk(batch):
+            if self.disk_manager.save_to_disk.call_count == 1:
+                raise OSError("disk full")
+            saved.set()
+
+        self.disk_manager.save_to_disk.side_effect = save_to_disk
+        background_saver = BackgroundSaver(self.disk_manager, batch_size=1)
+        background_saver.run()
+
+        background_saver.save({"state": [1, 2, 3]})
+        background_saver.save({"state": [4, 5, 6]})
+
+        self.assertTrue(saved.wait(timeout=10))
+        self.assertTrue(background_saver.thread.is_alive())
+        background_saver.stop()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
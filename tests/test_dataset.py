@@ -0,0 +1,99 @@
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from torch.utils.data import DataLoader
+from replaybuffer.dataset import ReplayBufferDataset
+from replaybuffer.disk_manager import DiskManager
+
+
+class TestReplayBufferDataset(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.h5_path = os.path.join(self.temp_dir.name, "test.h5")
+        self.disk_manager = DiskManager(self.h5_path, 1000, threading.RLock())
+        self.disk_manager._init_h5_file({"data": (2,), "done": (1,)})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _save(self, start, stop):
+        data = np.repeat(np.arange(start, stop, dtype=np.float32)[:, None], 2, 1)
+        self.disk_manager.save_to_disk(
+            {"data": data, "done": np.zeros((stop - start, 1), dtype=np.float32)}
+        )
+
+    def test_iter_single_process(self):
+        self._save(0, 10)
+        dataset = ReplayBufferDataset(self.disk_manager, chunk_size=4)
+        samples = list(dataset)
+
+        self.assertEqual([sample["data"][0] for sample in samples], list(range(10)))
+
+    def test_iter_chunks(self):
+        self._save(0, 10)
+        dataset = ReplayBufferDataset(
+            self.disk_manager, chunk_size=4, yield_chunks=True, keys=["data"]
+        )
+        chunks = list(dataset)
+
+        self.assertEqual([len(chunk["data"]) for chunk in chunks], [4, 4, 2])
+        self.assertEqual(list(chunks[0].keys()), ["data"])
+
+    def test_pickle(self):
+        self._save(0, 10)
+        dataset = pickle.loads(pickle.dumps(ReplayBufferDataset(self.disk_manager)))
+        self.assertEqual(len(list(dataset)), 10)
+
+    @patch("replaybuffer.dataset.get_worker_info")
+    def test_worker_ranges_do_not_overlap(self, mock_get_worker_info):
+        self._save(0, 10)
+        dataset = ReplayBufferDataset(self.disk_manager)
+        ranges = []
+        for worker_id in range(3):
+            mock_get_worker_info.return_value = MagicMock(id=worker_id, num_workers=3)
+            ranges.append(dataset._worker_range())
+
+        self.assertEqual(ranges, [(0, 4), (4, 8), (8, 10)])
+
+    def test_data_loader_while_writing(self):
+        self._save(0, 60)
+
+        # Every start method has to pickle the dataset or copy it into workers
+        for context in ("fork", "spawn"):
+            with self.subTest(context=context):
+                dataset = ReplayBufferDataset(
+                    self.disk_manager, chunk_size=7, yield_chunks=True
+                )
+                loader = DataLoader(
+                    dataset,
+                    batch_size=None,
+                    num_workers=2,
+                    multiprocessing_context=context,
+                )
+
+                # Keep appending past the snapshot while workers read
+                stop = threading.Event()
+
+                def write():
+                    while not stop.is_set() and self.disk_manager.length < 990:
+                        start = self.disk_manager.length
+                        self._save(start, start + 10)
+
+                writer = threading.Thread(target=write)
+                writer.start()
+                try:
+                    rows = np.concatenate([chunk["data"][:, 0].numpy() for chunk in loader])
+                finally:
+                    stop.set()
+                    writer.join()
+
+                _, length, _ = dataset.snapshot
+                np.testing.assert_array_equal(np.sort(rows), np.arange(length))
+
+
+if __name__ == "__main__":
+    unittest.main()
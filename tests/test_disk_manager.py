@@ -4,6 +4,7 @@ import unittest
 import h5py as h5
 import numpy as np
 from threading import Lock
+from unittest.mock import patch
 from replaybuffer.disk_manager import DiskManager
 
 
@@ -24,7 +25,57 @@ class TestDiskManager(unittest.TestCase):
 
         with h5.File(self.h5_path, "r") as h5_file:
             self.assertIn("data", h5_file)
-            self.assertEqual(h5_file["data"].shape, (self.max_size, 10, 10))
+            self.assertEqual(h5_file["data"].shape, (0, 10, 10))
+            self.assertEqual(h5_file["data"].maxshape, (self.max_size, 10, 10))
+
+    def test_check_h5_path_not_hdf5(self):
+        with open(self.h5_path, "w") as f:
+            f.write("not hdf5")
+
+        with self.assertRaises(ValueError):
+            self.disk_manager._check_h5_path()
+
+    def test_save_to_disk_malformed_first_batch(self):
+        self.disk_manager.save_to_disk({"data": np.array([{"a": 1}, {"b": 2}])})
+
+        self.assertFalse(self.disk_manager.initialized)
+        self.assertEqual(self.disk_manager.length, 0)
+        self.assertEqual(self.disk_manager.disk_pointer, 0)
+        self.assertEqual(self.disk_manager.total_writes, 0)
+
+        data = {"data": np.random.rand(5, 10, 10).astype(np.float32)}
+        self.disk_manager.save_to_disk(data)
+
+        self.assertEqual(self.disk_manager.length, 5)
+        with h5.File(self.h5_path, "r") as h5_file:
+            np.testing.assert_array_equal(h5_file["data"][:5], data["data"])
+
+    def test_save_to_disk_grows_in_chunks(self):
+        self.disk_manager.grow_size = 16
+        shapes = {"data": (10, 10)}
+        self.disk_manager._init_h5_file(shapes)
+
+        data = {"data": np.random.rand(5, 10, 10).astype(np.float32)}
+        sizes = []
+        for _ in range(20):
+            self.disk_manager.save_to_disk(data)
+            with h5.File(self.h5_path, "r") as h5_file:
+                sizes.append(h5_file["data"].shape[0])
+
+        self.assertEqual(sizes[:4], [16, 16, 16, 32])
+        self.assertEqual(sizes[-1], self.max_size)
+
+    def test_save_to_disk_infers_schema(self):
+        data = {
+            "data": np.random.rand(5, 10, 10).astype(np.float32),
+            "done": np.zeros((5, 1), dtype=np.float32),
+        }
+        self.disk_manager.save_to_disk(data)
+
+        with h5.File(self.h5_path, "r") as h5_file:
+            self.assertEqual(h5_file["data"].maxshape, (self.max_size, 10, 10))
+            self.assertEqual(h5_file["done"].maxshape, (self.max_size, 1))
+            np.testing.assert_array_equal(h5_file["data"][:5], data["data"])
 
     def test_save_to_disk(self):
         shapes = {"data": (10, 10)}
@@ -138,6 +189,139 @@ class TestDiskManager(unittest.TestCase):
 
             np.testing.assert_array_equal(loaded_data["data"], data["data"][indices])
 
+    def test_iter_chunks(self):
+        shapes = {"data": (10, 10)}
+        self.disk_manager._init_h5_file(shapes)
+
+        data = {"data": np.random.rand(50, 10, 10).astype(np.float32)}
+        self.disk_manager.save_to_disk(data)
+
+        chunks = list(self.disk_manager.iter_chunks(chunk_size=16))
+
+        self.assertEqual([len(chunk["data"]) for chunk in chunks], [16, 16, 16, 2])
+        np.testing.assert_array_equal(
+            np.concatenate([chunk["data"] for chunk in chunks]), data["data"]
+        )
+
+    def test_iter_chunks_wrap(self):
+        shapes = {"data": (10, 10)}
+        self.disk_manager._init_h5_file(shapes)
+
+        data = {"data": np.random.rand(130, 10, 10).astype(np.float32)}
+        self.disk_manager.save_to_disk({"data": data["data"][:100]})
+        self.disk_manager.save_to_disk({"data": data["data"][100:]})
+
+        chunks = list(self.disk_manager.iter_chunks(chunk_size=16, read_ahead=1))
+
+        np.testing.assert_array_equal(
+            np.concatenate([chunk["data"] for chunk in chunks]), data["data"][30:]
+        )
+
+    def test_iter_chunks_range(self):
+        shapes = {"data": (10, 10)}
+        self.disk_manager._init_h5_file(shapes)
+
+        data = {"data": np.random.rand(50, 10, 10).astype(np.float32)}
+        self.disk_manager.save_to_disk(data)
+
+        chunks = list(self.disk_manager.iter_chunks(chunk_size=8, start=10, stop=30))
+
+        np.testing.assert_array_equal(
+            np.concatenate([chunk["data"] for chunk in chunks]), data["data"][10:30]
+        )
+
+    def test_episode_end_offsets(self):
+        shapes = {"data": (10, 10), "done": (1,)}
+        self.disk_manager._init_h5_file(shapes)
+
+        done = np.zeros((10, 1), dtype=np.float32)
+        done[3] = done[7] = 1
+        data = {"data": np.random.rand(10, 10, 10).astype(np.float32), "done": done}
+        self.disk_manager.save_to_disk(data)
+
+        offsets = self.disk_manager.episode_end_offsets([0, 3, 4, 8])
+        np.testing.assert_array_equal(offsets, [3, 0, 3, 1])
+
+    def test_episode_end_offsets_wrap(self):
+        shapes = {"data": (10, 10), "done": (1,)}
+        self.disk_manager._init_h5_file(shapes)
+
+        done = np.zeros((100, 1), dtype=np.float32)
+        done[5] = 1
+        data = {"data": np.random.rand(100, 10, 10).astype(np.float32), "done": done}
+        self.disk_manager.save_to_disk(data)
+
+        data["done"] = np.zeros((10, 1), dtype=np.float32)
+        self.disk_manager.save_to_disk({k: v[:10] for k, v in data.items()})
+
+        # The oldest experience is now at index 10 and the newest at index 9
+        offsets = self.disk_manager.episode_end_offsets([95, 2, 9])
+        np.testing.assert_array_equal(offsets, [14, 7, 0])
+
+    def test_iter_chunks_read_ahead(self):
+        shapes = {"data": (10, 10)}
+        self.disk_manager._init_h5_file(shapes)
+
+        data = {"data": np.random.rand(50, 10, 10).astype(np.float32)}
+        self.disk_manager.save_to_disk(data)
+
+        # Chunks are planned lazily, right before their read is submitted
+        with patch.object(
+            self.disk_manager,
+            "_physical_slices",
+            wraps=self.disk_manager._physical_slices,
+        ) as planned:
+            chunks = self.disk_manager.iter_chunks(chunk_size=5, read_ahead=2)
+            next(chunks)
+            self.assertEqual(planned.call_count, 3)
+
+            next(chunks)
+            self.assertEqual(planned.call_count, 4)
+            chunks.close()
+
+    def test_iter_chunks_snapshot(self):
+        shapes = {"data": (10, 10)}
+        self.disk_manager._init_h5_file(shapes)
+
+        data = {"data": np.random.rand(50, 10, 10).astype(np.float32)}
+        self.disk_manager.save_to_disk(data)
+        snapshot = self.disk_manager.snapshot()
+        self.disk_manager.save_to_disk(data)
+
+        self.assertEqual(snapshot, (0, 50, 50))
+        chunks = list(self.disk_manager.iter_chunks(chunk_size=16, snapshot=snapshot))
+        self.assertEqual(sum(len(chunk["data"]) for chunk in chunks), 50)
+
+    def test_iter_chunks_overwritten(self):
+        shapes = {"data": (10, 10)}
+        self.disk_manager._init_h5_file(shapes)
+
+        data = {"data": np.random.rand(50, 10, 10).astype(np.float32)}
+        self.disk_manager.save_to_disk(data)
+        self.disk_manager.save_to_disk(data)
+
+        chunks = self.disk_manager.iter_chunks(chunk_size=10, read_ahead=0)
+        next(chunks)
+
+        # Overwrites the oldest 20 rows, the second chunk is not read yet
+        self.disk_manager.save_to_disk({"data": data["data"][:20]})
+        with self.assertRaises(RuntimeError):
+            next(chunks)
+
+    def test_iter_chunks_not_overwritten(self):
+        shapes = {"data": (10, 10)}
+        self.disk_manager._init_h5_file(shapes)
+
+        data = {"data": np.random.rand(50, 10, 10).astype(np.float32)}
+        self.disk_manager.save_to_disk(data)
+        self.disk_manager.save_to_disk(data)
+
+        chunks = self.disk_manager.iter_chunks(chunk_size=10, read_ahead=0)
+        next(chunks)
+
+        # Only the chunk already read is overwritten
+        self.disk_manager.save_to_disk({"data": data["data"][:10]})
+        self.assertEqual(len(list(chunks)), 9)
 
 if __name__ == "__main__":
     unittest.main()
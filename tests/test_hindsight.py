@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from threading import Lock
+import numpy as np
+from replaybuffer.disk_manager import DiskManager
+from replaybuffer.hindsight import HindsightRelabeler
+
+
+def distance_reward(achieved_goal, goal):
+    return -(np.linalg.norm(achieved_goal - goal, axis=-1) > 0.5).astype(np.float32)
+
+
+class TestHindsightRelabeler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.h5_path = os.path.join(self.temp_dir.name, "test.h5")
+        self.disk_manager = DiskManager(self.h5_path, 20, Lock())
+        self.disk_manager._init_h5_file(
+            {"goal": (2,), "achieved_goal": (2,), "reward": (1,), "done": (1,)}
+        )
+
+        # Two episodes of 5 steps, the achieved goal encodes the step index
+        done = np.zeros((10, 1), dtype=np.float32)
+        done[4] = done[9] = 1
+        self.data = {
+            "goal": np.full((10, 2), 100, dtype=np.float32),
+            "achieved_goal": np.repeat(np.arange(10, dtype=np.float32)[:, None], 2, 1),
+            "reward": np.full((10, 1), -1, dtype=np.float32),
+            "done": done,
+        }
+        self.disk_manager.save_to_disk(self.data)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _batch(self, indices):
+        return {key: value[indices].copy() for key, value in self.data.items()}
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            HindsightRelabeler(distance_reward, strategy="episode")
+
+    def test_final(self):
+        relabeler = HindsightRelabeler(distance_reward, strategy="final", relabel_prob=1.0)
+        indices = np.array([0, 2, 4, 6])
+        batch = relabeler.relabel(self.disk_manager, indices, self._batch(indices))
+
+        np.testing.assert_array_equal(batch["goal"][:, 0], [4, 4, 4, 9])
+        np.testing.assert_array_equal(batch["reward"][:, 0], [-1, -1, 0, -1])
+
+    def test_future_stays_in_episode(self):
+        relabeler = HindsightRelabeler(distance_reward, relabel_prob=1.0, seed=0)
+        indices = np.array([0, 1, 3, 5, 8, 9])
+
+        for _ in range(20):
+            batch = relabeler.relabel(self.disk_manager, indices, self._batch(indices))
+            goals = batch["goal"][:, 0]
+            self.assertTrue(np.all(goals >= indices))
+            self.assertTrue(np.all(goals <= np.where(indices < 5, 4, 9)))
+            np.testing.assert_array_equal(
+                batch["reward"][:, 0], np.where(goals == indices, 0, -1)
+            )
+
+    def test_relabel_prob_zero(self):
+        relabeler = HindsightRelabeler(distance_reward, relabel_prob=0.0)
+        indices = np.array([0, 1, 2])
+        batch = relabeler.relabel(self.disk_manager, indices, self._batch(indices))
+
+        np.testing.assert_array_equal(batch["goal"], self.data["goal"][indices])
+
+
+if __name__ == "__main__":
+    unittest.main()
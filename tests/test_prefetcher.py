@@ -1,15 +1,18 @@
 import queue
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 import torch
 from replaybuffer.prefetcher import Prefetcher
 from replaybuffer.disk_manager import DiskManager
+from replaybuffer.hindsight import HindsightRelabeler
 
 
 class TestPrefetcher(unittest.TestCase):
     def setUp(self):
         self.disk_manager = MagicMock(spec=DiskManager)
         self.disk_manager.length = 10
+        self.disk_manager.lock = threading.RLock()
         self.device = torch.device("cpu")
         self.batch_size = 4
         self.prefetcher = Prefetcher(self.disk_manager, self.device, self.batch_size)
@@ -49,6 +52,57 @@ class TestPrefetcher(unittest.TestCase):
         self.assertFalse(self.prefetcher.running)
         self.prefetcher.thread.join.assert_called_once()
 
+    def test_relabel(self):
+        lock = self.disk_manager.lock = MagicMock()
+        lock_held = []
+
+        def held():
+            lock_held.append(lock.__enter__.call_count > lock.__exit__.call_count)
+
+        def load_batch_from_disk(indices):
+            held()
+            return {"goal": [0]}
+
+        def relabel(dm, indices, batch):
+            held()
+            return {"relabeled": indices}
+
+        relabeler = MagicMock(spec=HindsightRelabeler)
+        relabeler.relabel.side_effect = relabel
+        self.disk_manager.load_batch_from_disk.side_effect = load_batch_from_disk
+        prefetcher = Prefetcher(
+            self.disk_manager, self.device, self.batch_size, relabeler=relabeler
+        )
+
+        prefetcher.run()
+        try:
+            sample = prefetcher.prefetch_batches.get(timeout=5)
+        finally:
+            prefetcher.stop()
+
+        self.assertEqual(len(sample["relabeled"]), self.batch_size)
+        args = relabeler.relabel.call_args.args
+        self.assertIs(args[0], self.disk_manager)
+        self.assertEqual(args[2], {"goal": [0]})
+        self.assertTrue(all(lock_held[:2]))
+
+    def test_relabel_error_skips_batch(self):
+        relabeler = MagicMock(spec=HindsightRelabeler)
+        relabeler.relabel.side_effect = [KeyError("goal"), {"relabeled": True}]
+        self.disk_manager.load_batch_from_disk.return_value = {"goal": [0]}
+        prefetcher = Prefetcher(
+            self.disk_manager, self.device, self.batch_size, relabeler=relabeler
+        )
+
+        prefetcher.run()
+        try:
+            sample = prefetcher.prefetch_batches.get(timeout=5)
+            self.assertTrue(prefetcher.prefetch_thread.is_alive())
+        finally:
+            prefetcher.stop()
+
+        self.assertEqual(sample, {"relabeled": True})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,8 @@
+import sys
 import unittest
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
+import numpy as np
 from replaybuffer.replay_buffer import ReplayBuffer
 
 class TestReplayBuffer(unittest.TestCase):
@@ -31,6 +34,35 @@ class TestReplayBuffer(unittest.TestCase):
         }
         self.mock_disk_manager._init_h5_file.assert_called_once_with(shapes)
 
+    @patch('replaybuffer.replay_buffer.DiskManager')
+    @patch('replaybuffer.replay_buffer.Prefetcher')
+    @patch('replaybuffer.replay_buffer.BackgroundSaver')
+    def test_init_h5_file_lazy_schema(self, MockBackgroundSaver, MockPrefetcher, MockDiskManager):
+        ReplayBuffer(self.max_size, self.h5_path, None, self.device, self.batch_size)
+        MockDiskManager.return_value._init_h5_file.assert_not_called()
+        MockDiskManager.return_value._check_h5_path.assert_called_once_with()
+
+    @patch('replaybuffer.replay_buffer.DiskManager')
+    @patch('replaybuffer.replay_buffer.Prefetcher')
+    @patch('replaybuffer.replay_buffer.BackgroundSaver')
+    def test_relabeler_requires_goal_shape(self, MockBackgroundSaver, MockPrefetcher, MockDiskManager):
+        with self.assertRaises(ValueError):
+            ReplayBuffer(self.max_size, self.h5_path, self.image_shape, self.device, self.batch_size, relabeler=MagicMock())
+        MockPrefetcher.return_value.run.assert_not_called()
+
+    @patch('replaybuffer.replay_buffer.DiskManager')
+    @patch('replaybuffer.replay_buffer.Prefetcher')
+    @patch('replaybuffer.replay_buffer.BackgroundSaver')
+    def test_add_requires_goals(self, MockBackgroundSaver, MockPrefetcher, MockDiskManager):
+        replay_buffer = ReplayBuffer(self.max_size, self.h5_path, self.image_shape, self.device, self.batch_size, goal_shape=(2,))
+        with self.assertRaises(ValueError):
+            replay_buffer.add([0], 1, 1.0, [0], False, goal=[0, 0])
+        MockBackgroundSaver.return_value.save.assert_not_called()
+
+        replay_buffer.add([0], 1, 1.0, [0], False, goal=[0, 0], achieved_goal=[1, 1])
+        saved = MockBackgroundSaver.return_value.save.call_args.args[0]
+        self.assertEqual(saved["achieved_goal"], [1, 1])
+
     def test_start_subprocesses(self):
         self.mock_prefetcher.run.assert_called_once()
         self.mock_background_saver.run.assert_called_once()
@@ -53,6 +85,22 @@ class TestReplayBuffer(unittest.TestCase):
             }
         )
 
+    def test_prepare_without_torch(self):
+        data = np.zeros((2, 2))
+        with patch.dict(sys.modules, {"torch": None}):
+            self.assertIs(ReplayBuffer.prepare(data), data)
+
+    def test_prepare_tensor(self):
+        class Tensor:
+            def cpu(self):
+                return self
+
+            def numpy(self):
+                return np.ones(3)
+
+        with patch.dict(sys.modules, {"torch": SimpleNamespace(Tensor=Tensor)}):
+            np.testing.assert_array_equal(ReplayBuffer.prepare(Tensor()), np.ones(3))
+
     def test_sample(self):
         self.replay_buffer.sample()
         self.mock_prefetcher.sample.assert_called_once()